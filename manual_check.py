@@ -10,6 +10,8 @@ import time
 import shutil
 import logging
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Настройка путей импорта ---
 current_dir = os.getcwd()
@@ -45,73 +47,119 @@ def clean_previous_run():
     if os.path.exists(TRAPS_DIR):
         shutil.rmtree(TRAPS_DIR)
 
+def _scan_tree(path, level=0):
+    """
+    Рекурсивный обход директории на базе os.scandir.
+
+    В отличие от os.walk + os.stat, отдает объекты DirEntry, у которых
+    результат stat() кэшируется, поэтому повторный системный вызов не нужен.
+
+    Yields:
+        tuple: (уровень вложенности, путь директории, список DirEntry файлов).
+    """
+    files, dirs = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry)
+            else:
+                files.append(entry)
+
+    yield level, path, files
+    for entry in dirs:
+        yield from _scan_tree(entry.path, level + 1)
+
+def _check_file(entry):
+    """
+    Выполняет дорогие проверки одного файла (stat и CRC архива).
+
+    Вызывается из пула потоков: zlib при подсчете CRC отпускает GIL,
+    поэтому проверки нескольких Office-файлов идут параллельно.
+
+    Returns:
+        tuple: (stat_result или None при ошибке доступа, is_valid_zip).
+    """
+    try:
+        # Берем stat из DirEntry — без повторного обращения к ФС
+        stats = entry.stat(follow_symlinks=False)
+    except OSError:
+        return None, False
+
+    # Проверка 2: Бинарная целостность (для Office)
+    is_valid_zip = True
+    if entry.name.endswith(('.docx', '.xlsx')):
+        # Один open: конструктор ZipFile сам проверяет EOCD и разбирает
+        # центральный каталог, отдельный is_zipfile() не нужен
+        try:
+            with zipfile.ZipFile(entry.path) as zf:
+                if zf.testzip() is not None:
+                    is_valid_zip = False
+        except (zipfile.BadZipFile, OSError, zlib.error, RuntimeError, NotImplementedError):
+            # testzip распаковывает члены архива: битый deflate-поток дает
+            # zlib.error, шифрование/неизвестный метод — RuntimeError и
+            # NotImplementedError. Это FAIL одного файла, а не всего аудита
+            is_valid_zip = False
+
+    return stats, is_valid_zip
+
 def verify_files(startpath):
     """
     Проходит по всем созданным файлам и проверяет их качество:
     1. Time Stomping (дата должна быть старой).
     2. Integrity (бинарники не должны быть битыми).
     """
-    print("\n--- INTEGRITY AND ATTRIBUTE VERIFICATION REPORT ---")
-    print(f"{'STATUS':<10} {'OFFSET (DAYS)':<15} {'FILEPATH'}")
-    print("-" * 80)
+    # Отчет копится в списке и выводится одним write в конце
+    lines = [
+        "\n--- INTEGRITY AND ATTRIBUTE VERIFICATION REPORT ---",
+        f"{'STATUS':<10} {'OFFSET (DAYS)':<15} {'FILEPATH'}",
+        "-" * 80,
+    ]
     
     issues = 0
-    current_time = time.time()
+    # Порог считаем один раз: файл "старый", если mtime раньше суток назад
     one_day_seconds = 86400
+    cutoff_mtime = time.time() - one_day_seconds
 
-    for root, dirs, files in os.walk(startpath):
-        level = root.replace(startpath, '').count(os.sep)
+    # Один проход по дереву, затем все проверки уходят в пул потоков.
+    # pool.map сохраняет порядок, поэтому дерево печатается как раньше.
+    tree = list(_scan_tree(startpath))
+    all_entries = [entry for _, _, entries in tree for entry in entries]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        results = iter(list(pool.map(_check_file, all_entries)))
+
+    for level, root, entries in tree:
         indent = ' ' * 4 * (level)
-        print(f"{indent}[DIR] {os.path.basename(root)}/")
+        lines.append(f"{indent}[DIR] {os.path.basename(root)}/")
         
         subindent = ' ' * 4 * (level + 1)
-        for f in files:
-            filepath = os.path.join(root, f)
-            try:
-                stats = os.stat(filepath)
-            except OSError:
-                print(f"{subindent}[ERR] {f} (Access Denied)")
+        for entry in entries:
+            f = entry.name
+            stats, is_valid_zip = next(results)
+            if stats is None:
+                lines.append(f"{subindent}[ERR] {f} (Access Denied)")
                 issues += 1
                 continue
             
             # Проверка 1: Time Stomping
             # Файл должен быть старше 24 часов (мы генерируем от 10 дней назад)
-            age_seconds = current_time - stats.st_mtime
-            is_old = age_seconds > one_day_seconds
-            
-            # Проверка 2: Бинарная целостность (для Office)
-            is_valid_zip = True
-            if f.endswith(('.docx', '.xlsx')):
-                if not zipfile.is_zipfile(filepath):
-                    is_valid_zip = False
-                else:
-                    try:
-                        with zipfile.ZipFile(filepath) as zf:
-                            if zf.testzip() is not None:
-                                is_valid_zip = False
-                    except:
-                        is_valid_zip = False
+            is_old = stats.st_mtime < cutoff_mtime
 
             # Вывод статуса
-            status_tag = "[OK]"
-            details = []
-            
             if not is_old:
-                status_tag = "[WARN]"
-                details.append("FRESH_TIME (0d)")
+                status_tag, details = "[WARN]", "FRESH_TIME (0d)"
                 issues += 1
             else:
                 file_date = time.strftime('%Y-%m-%d', time.localtime(stats.st_mtime))
-                details.append(f"TS_Date:{file_date}")
+                status_tag, details = "[OK]", f"TS_Date:{file_date}"
 
             if not is_valid_zip:
                 status_tag = "[FAIL]"
-                details.append("CORRUPTED_STRUCTURE")
+                details += " | CORRUPTED_STRUCTURE"
                 issues += 1
 
-            details_str = " | ".join(details)
-            print(f"{subindent}{status_tag:<8} {f:<30} {details_str}")
+            lines.append(f"{subindent}{status_tag:<8} {f:<30} {details}")
 
+    sys.stdout.write("\n".join(lines) + "\n")
     return issues
 
 def main():
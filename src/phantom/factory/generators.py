@@ -1,45 +1,334 @@
 import os
-import copy
+import stat
 import shutil
-import random
 import logging
-import uuid
-import zipfile
-import base64
-from typing import Optional, Dict, Any
-from jinja2 import Template
-from faker import Faker
-from .metadata import stomp_timestamp
+import binascii
+import functools
+import struct
+from datetime import date
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
+from .metadata import compute_stomp_times
+
+# Faker (сотни модулей провайдеров), Mimesis и Jinja2 импортируются лениво,
+# при первом создании генератора: импорт модуля ради манифеста или
+# dry-run не должен платить за их загрузку
+if TYPE_CHECKING:
+    from faker import Faker
+    from mimesis import Generic
+
+try:
+    import fcntl
+except ImportError:  # Не-POSIX платформы (Windows)
+    fcntl = None
 
 logger = logging.getLogger("Phantom.Generator")
 
+# ioctl FICLONE (Linux): reflink-копия на CoW файловых системах (Btrfs, XFS)
+_FICLONE = 0x40049409
+
+# O_TMPFILE (Linux >= 3.11): безымянный inode в директории; 0 — не поддерживается
+_O_TMPFILE = getattr(os, "O_TMPFILE", 0)
+
+# End Of Central Directory: сигнатура, размер записи без комментария и
+# максимальная длина комментария ZIP (поле — uint16)
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_EOCD_SIZE = 22
+_ZIP_MAX_COMMENT = 0xFFFF
+
+# 48 байт данных кодируются ровно в 64 символа Base64 — длина строки PEM
+_PEM_CHUNK = 48
+
+# Неизменяемые части watermark, закодированные один раз при импорте
+_WATERMARK_PREFIX = b"\n<!-- PHANTOM_TRAP_ID:"
+_WATERMARK_SUFFIX = b" -->"
+_ZIP_COMMENT_PREFIX = b"PHANTOM_ID:"
+
+# ZIP-based форматы (Office), куда watermark внедряется в комментарий архива
+_ZIP_EXTENSIONS = frozenset({".docx", ".xlsx", ".pptx", ".zip"})
+
+@functools.lru_cache(maxsize=None)
+def _get_faker(locale: str) -> "Faker":
+    """
+    Возвращает общий экземпляр Faker для указанной локали.
+
+    Создание Faker дорогое (загрузка и резолвинг провайдеров), поэтому
+    экземпляр создается один раз на локаль и переиспользуется всеми генераторами.
+    """
+    from faker import Faker
+
+    return Faker(locale)
+
+@functools.lru_cache(maxsize=None)
+def _get_mimesis(locale: str) -> "Generic":
+    """
+    Возвращает общий экземпляр Mimesis для локали в формате Faker ("en_US").
+
+    Mimesis вызывает провайдеры напрямую, без диспетчеризации Faker, и
+    используется для простых синтетических полей. Если точной локали нет
+    (например "en-us"), берется язык ("en"), затем английская по умолчанию.
+    """
+    from mimesis import Generic
+    from mimesis.locales import Locale
+
+    tag = locale.replace("_", "-").lower()
+    for candidate in (tag, tag.split("-")[0]):
+        try:
+            return Generic(locale=Locale(candidate))
+        except ValueError:
+            continue
+    return Generic(locale=Locale.EN)
+
+def _pem_wrap(raw: bytes) -> str:
+    """
+    Кодирует байты (bytes или memoryview) в Base64 со строками по 64 символа (стандарт PEM).
+
+    Каждый блок из 48 байт кодируется одним вызовом binascii.b2a_base64,
+    который сам добавляет перевод строки, — без нарезки строки в Python.
+    """
+    chunks = [raw[i:i + _PEM_CHUNK] for i in range(0, len(raw), _PEM_CHUNK)]
+    return b"".join(map(binascii.b2a_base64, chunks)).decode('ascii').rstrip('\n')
+
+def _fmt_meta(metadata: Optional[Dict[str, Any]]) -> str:
+    """
+    Форматирует метаданные ловушки в суффикс для отладочных логов.
+
+    Returns:
+        str: Строка вида " [user@host | category]" или "", если метаданных нет.
+    """
+    if not metadata:
+        return ""
+    return f" [{metadata.get('user', 'any')}@{metadata.get('host', 'any')} | {metadata.get('category', 'any')}]"
+
+def _fast_copy(src: str, dst: str) -> None:
+    """
+    Копирует файл, не прогоняя данные через буферы Python.
+
+    Порядок стратегий:
+    1. FICLONE — мгновенная reflink-копия (Btrfs/XFS), без копирования данных.
+    2. os.copy_file_range — копирование внутри ядра (reflink, где ФС умеет).
+    3. os.sendfile — копирование внутри ядра для старых ядер.
+    4. shutil.copyfileobj — обычный userspace-цикл (не-Linux платформы).
+
+    Ядерная стратегия засчитывается, только если скопирован весь файл:
+    преждевременный 0 вместо ошибки (некоторые ФС, сжавшийся источник)
+    обнуляет результат и передает копирование следующей стратегии.
+
+    Метаданные (права, время) не переносятся: временные метки ловушки
+    все равно сразу перезаписываются Time Stomping.
+
+    Raises:
+        OSError: Если файл не удалось скопировать ни одним способом.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(in_fd).st_size
+
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(out_fd, _FICLONE, in_fd)
+                return
+            except OSError:
+                # ENOTSUP/EXDEV/EINVAL: ФС не поддерживает reflink
+                pass
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                offset = 0
+                while offset < size:
+                    copied = os.copy_file_range(in_fd, out_fd, size - offset, offset, offset)
+                    if copied == 0:
+                        break
+                    offset += copied
+                if offset == size:
+                    return
+                # Часть ФС (FUSE, overlay, между ФС на некоторых ядрах) вместо
+                # ошибки возвращает 0 раньше конца: копия неполная, начинаем заново
+                os.ftruncate(out_fd, 0)
+            except OSError:
+                # Ядро или ФС не поддерживают copy_file_range — начинаем заново
+                os.ftruncate(out_fd, 0)
+
+        if hasattr(os, "sendfile"):
+            try:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                if offset == size:
+                    return
+                # 0 раньше конца (например, источник уменьшился после fstat):
+                # копия неполная — начинаем заново через userspace-цикл
+                os.ftruncate(out_fd, 0)
+                os.lseek(out_fd, 0, os.SEEK_SET)
+            except OSError:
+                # Ядро не умеет sendfile между этими файлами — начинаем заново
+                os.ftruncate(out_fd, 0)
+                os.lseek(out_fd, 0, os.SEEK_SET)
+
+        # Копирует файл до фактического EOF источника, а не до размера из fstat
+        shutil.copyfileobj(fsrc, fdst)
+
+def _write_via_tmpfile(path: str, data: bytes, times_ns: Tuple[int, int]) -> bool:
+    """
+    Атомарно создает файл с готовым содержимым и временными метками.
+
+    Данные пишутся в безымянный inode (O_TMPFILE) в целевой директории,
+    метки ставятся по тому же fd, после чего inode получает имя через
+    linkat (/proc/self/fd/N). Недописанная ловушка с "свежей" датой
+    никогда не видна в файловой системе. Если файл уже существует
+    (повторное развертывание), новому inode переносятся права и владелец
+    старого файла, он связывается с временным именем и атомарно подменяет
+    старый файл через os.replace.
+
+    Args:
+        path (str): Итоговый путь файла.
+        data (bytes): Содержимое.
+        times_ns (Tuple[int, int]): (atime_ns, mtime_ns) для os.utime.
+
+    Returns:
+        bool: False, если путь недоступен (не Linux, ФС без O_TMPFILE,
+              нет /proc, на месте ловушки не обычный файл или нельзя
+              сохранить его владельца) — тогда вызывающий пишет файл
+              обычным способом.
+    """
+    if not _O_TMPFILE:
+        return False
+
+    # Директорию открываем явно: имена внутри нее разрешаются относительно
+    # dir_fd, а с dst_dir_fd os.link выполняет именно linkat — link() без
+    # AT_SYMLINK_FOLLOW не проходит по ссылке /proc/self/fd/N (EXDEV)
+    try:
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return False
+    name = os.path.basename(path)
+
+    try:
+        try:
+            fd = os.open(".", _O_TMPFILE | os.O_WRONLY, 0o666, dir_fd=dir_fd)
+        except OSError:
+            # EOPNOTSUPP/EISDIR/EINVAL: ядро или ФС не умеют O_TMPFILE
+            return False
+
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.utime(fd, ns=times_ns)
+
+            proc_path = f"/proc/self/fd/{fd}"
+            try:
+                os.link(proc_path, name, dst_dir_fd=dir_fd, follow_symlinks=True)
+                return True
+            except FileExistsError:
+                pass
+            except OSError:
+                # /proc не смонтирован или linkat запрещен — безымянный inode
+                # освободится при закрытии fd
+                return False
+
+            # Повторное развертывание: open("wb") сохранил бы права и владельца
+            # существующего файла, поэтому переносим их на новый inode
+            st = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+            if not stat.S_ISREG(st.st_mode):
+                # Симлинк или специальный файл: подмена изменила бы семантику записи
+                return False
+            os.fchmod(fd, stat.S_IMODE(st.st_mode))
+            if (st.st_uid, st.st_gid) != (os.geteuid(), os.getegid()):
+                try:
+                    os.fchown(fd, st.st_uid, st.st_gid)
+                except PermissionError:
+                    return False
+
+            # Номер fd уникален среди открытых в процессе, поэтому имя не пересекается
+            tmp_name = f"{name}.{os.getpid()}.{fd}.tmp"
+            os.link(proc_path, tmp_name, dst_dir_fd=dir_fd, follow_symlinks=True)
+            try:
+                os.replace(tmp_name, name, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+            except OSError:
+                os.unlink(tmp_name, dir_fd=dir_fd)
+                raise
+            return True
+        finally:
+            os.close(fd)
+    finally:
+        os.close(dir_fd)
+
 class ContentGenerator:
     """
     Генератор контента для файлов-ловушек.
 
     Отвечает за создание реалистичного содержимого для текстовых и бинарных файлов.
-    Использует библиотеку Faker для генерации данных, Jinja2 для шаблонизации
+    Использует библиотеки Mimesis и Faker для генерации данных, Jinja2 для шаблонизации
     и различные техники (Time Stomping, Watermarking) для повышения правдоподобности.
     """
     
-    def __init__(self):
-        """Инициализирует генератор с использованием стандартного английского Faker."""
-        self.fake = Faker()
+    def __init__(self, templates_dir: str, locale: str = "en_US"):
+        """
+        Инициализирует генератор с использованием закэшированного Faker.
 
-    def _generate_fake_cert_body(self, length: int = 1000) -> str:
+        Args:
+            templates_dir (str): Директория с Jinja2 шаблонами.
+            locale (str): Локаль Faker (по умолчанию английская).
         """
-        Генерирует случайный Base64 блок, визуально имитирующий тело сертификата (PEM формат).
+        from jinja2 import Environment, FileSystemLoader
+
+        # Окружение Jinja2 компилирует каждый шаблон один раз и хранит его
+        # во внутреннем кэше: повторные ловушки из того же шаблона только рендерятся
+        self.jinja_env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=False,
+            auto_reload=False,
+            cache_size=400,
+        )
+        self.fake = _get_faker(locale)
+        self.m = _get_mimesis(locale)
+        # Генератор случайных чисел самого Faker: не трогаем глобальный random
+        self.random = self.fake.random
+
+        # Заранее связываем методы провайдеров: прокси Faker резолвит каждый
+        # атрибут через __getattr__, а в горячем пути это лишняя работа.
+        # Простые поля берем из Mimesis, Faker — для того, чего в Mimesis нет
+        # (приватные IP, шаблонные строки) или что там не подходит: пароли
+        # Mimesis содержат кавычки и "\", которые ломают JSON/ENV шаблоны.
+        self._full_name = self.m.person.full_name
+        self._email = self.m.person.email
+        self._company = self.m.finance.company
+        self._word = self.m.text.word
+        self._hostname = self.m.internet.hostname
+        self._formatted_datetime = self.m.datetime.formatted_datetime
+        self._password = self.fake.password
+        self._pystr_format = self.fake.pystr_format
+        self._hexify = self.fake.hexify
+        self._ipv4_private = self.fake.ipv4_private
+        self._date_this_year = self.fake.date_this_year
+        self._randint = self.random.randint
+
+        # Базовый профиль "жертвы" строится один раз на генератор
+        self._base_context: Optional[Dict[str, Any]] = None
+
+    def _generate_fake_cert_bodies(self, *lengths: int) -> List[str]:
+        """
+        Генерирует случайные Base64 блоки, визуально имитирующие тела сертификатов (PEM формат).
+
+        Энтропия для всех блоков берется одним вызовом os.urandom и
+        нарезается срезами memoryview, без копирования.
 
         Args:
-            length (int): Длина генерируемого блока в байтах (до кодирования).
+            *lengths (int): Длины генерируемых блоков в байтах (до кодирования).
 
         Returns:
-            str: Строка Base64, разбитая на линии по 64 символа (стандарт PEM).
+            List[str]: Строки Base64, разбитые на линии по 64 символа (стандарт PEM).
         """
-        random_bytes = os.urandom(length)
-        b64_str = base64.b64encode(random_bytes).decode('utf-8')
-        # Разбиваем на строки по 64 символа, как принято в сертификатах
-        return '\n'.join(b64_str[i:i+64] for i in range(0, len(b64_str), 64))
+        buf = memoryview(os.urandom(sum(lengths)))
+        bodies = []
+        offset = 0
+        for length in lengths:
+            bodies.append(_pem_wrap(buf[offset:offset + length]))
+            offset += length
+        return bodies
 
     def create_base_context(self) -> Dict[str, Any]:
         """
@@ -48,29 +337,40 @@ class ContentGenerator:
         Эти данные (имя администратора, название компании, пароли) будут 
         использоваться во всех генерируемых файлах, создавая связную легенду.
 
+        Профиль мемоизируется на экземпляре: повторные вызовы возвращают
+        тот же словарь без новых обращений к Faker/Mimesis и os.urandom.
+        Словарь общий, поэтому изменять его нельзя (create_trap_context
+        делает копию).
+
         Returns:
             Dict[str, Any]: Словарь с общими данными для шаблонов.
         """
-        return {
+        if self._base_context is not None:
+            return self._base_context
+
+        ca_cert_body, client_cert_body, private_key_body = self._generate_fake_cert_bodies(1200, 1000, 1600)
+
+        self._base_context = {
             # --- Персональные данные ---
-            "admin_name": self.fake.name(),
-            "admin_email": self.fake.company_email(),
-            "company": self.fake.company(),
+            "admin_name": self._full_name(),
+            "admin_email": self._email(domains=[self._hostname()]),
+            "company": self._company(),
             
             # --- Технические данные ---
-            "db_host": f"db-prod-{self.fake.word()}.{self.fake.domain_name()}",
-            "db_password": self.fake.password(length=14, special_chars=True),
-            "aws_key": self.fake.pystr_format(string_format="????????????????"),
-            "sentry_key": self.fake.hexify(text="^" * 32),
-            "sentry_id": random.randint(10000, 99999),
-            "crm_ip": self.fake.ipv4_private(),
+            "db_host": f"db-prod-{self._word()}.{self._hostname()}",
+            "db_password": self._password(length=14, special_chars=True),
+            "aws_key": self._pystr_format(string_format="????????????????"),
+            "sentry_key": self._hexify(text="^" * 32),
+            "sentry_id": self._randint(10000, 99999),
+            "crm_ip": self._ipv4_private(),
 
             # --- Криптография (для VPN и SSH) ---
             # Генерируем уникальные "ключи" для этой сессии развертывания
-            "ca_cert_body": self._generate_fake_cert_body(1200),
-            "client_cert_body": self._generate_fake_cert_body(1000),
-            "private_key_body": self._generate_fake_cert_body(1600),
+            "ca_cert_body": ca_cert_body,
+            "client_cert_body": client_cert_body,
+            "private_key_body": private_key_body,
         }
+        return self._base_context
         
     def create_trap_context(self, base_context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -79,68 +379,94 @@ class ContentGenerator:
         Добавляет уникальные для каждого файла данные (версия, дата изменения),
         чтобы файлы выглядели созданными в разное время, но одним человеком.
 
+        Базовый контекст копируется поверхностно, слиянием в один dict-литерал:
+        все его значения неизменяемые (str, int, date), поэтому ссылки на них
+        можно разделять между ловушками.
+        Если в base_context появится изменяемое значение (list, dict), его
+        нужно копировать здесь явно.
+
         Args:
             base_context (Dict[str, Any]): Общий профиль жертвы.
 
         Returns:
             Dict[str, Any]: Расширенный контекст для рендеринга шаблона.
         """
-        ctx = copy.deepcopy(base_context)
-        ctx.update({
-            "version": f"v{random.randint(1,4)}.{random.randint(0,9)}.{random.randint(0,10)}",
-            "iso_date": self.fake.iso8601(),
-            "date": self.fake.date_this_year(),
-        })
-        return ctx
+        return {
+            **base_context,
+            "version": f"v{self._randint(1,4)}.{self._randint(0,9)}.{self._randint(0,10)}",
+            # Mimesis выбирает дату в пределах года, поэтому ограничиваем прошлым
+            # годом: дата "обновления" из будущего выдала бы ловушку
+            "iso_date": self._formatted_datetime("%Y-%m-%dT%H:%M:%S", start=2015, end=date.today().year - 1),
+            "date": self._date_this_year(),
+        }
 
     def create_text_trap(
         self,
-        template_path: str,
+        template_name: str,
         output_path: str,
         context: Dict[str, Any],
         metadata: Optional[Dict[str, Any]] = None,
-    ) -> None:
+        times_ns: Optional[Tuple[int, int]] = None,
+    ) -> Optional[str]:
         """
         Генерирует текстовый файл-ловушку (JSON, YAML, ENV, и т.д.) из шаблона.
 
-        1. Читает Jinja2 шаблон.
+        1. Берет скомпилированный Jinja2 шаблон из кэша окружения (или загружает его).
         2. Рендерит его с переданным контекстом.
-        3. Сохраняет результат.
-        4. Подделывает дату создания файла (Time Stomping).
+        3. Подделывает дату создания файла (Time Stomping).
+        4. Сохраняет результат: на Linux атомарно через O_TMPFILE + linkat,
+           с уже выставленными метками; иначе обычной записью.
 
         Args:
-            template_path (str): Путь к файлу шаблона.
-            output_path (str): Путь сохранения готовой ловушки.
+            template_name (str): Имя шаблона относительно директории шаблонов.
+            output_path (str): Путь сохранения готовой ловушки. Родительская
+                директория должна существовать (ее создает TrapFactory).
             context (Dict[str, Any]): Данные для подстановки в шаблон.
             metadata (Optional[Dict]): Дополнительные данные для логирования.
+            times_ns (Optional[Tuple[int, int]]): Заранее вычисленные метки
+                (atime_ns, mtime_ns) — TrapFactory раздает их пакетом из
+                compute_stomp_times_many; без них пара вычисляется здесь.
+
+        Returns:
+            Optional[str]: Путь созданной ловушки или None при ошибке.
         """
         try:
-            with open(template_path, "r", encoding="utf-8") as f:
-                template = Template(f.read())
+            template = self.jinja_env.get_template(template_name)
 
-            content = template.render(context)
+            # Кодируем один раз и пишем байты, минуя TextIOWrapper
+            data = template.render(context).encode("utf-8")
 
-            # Гарантируем, что целевая директория существует (например, .aws/)
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # Применяем технику Time Stomping по тому же fd, что и запись
+            if times_ns is None:
+                times_ns = compute_stomp_times()
 
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(content)
+            if not _write_via_tmpfile(output_path, data, times_ns):
+                with open(output_path, "wb") as f:
+                    f.write(data)
 
-            # Применяем технику Time Stomping
-            stomp_timestamp(output_path)
+                    # Буфер сбрасываем до utime: запись при закрытии файла
+                    # снова обновила бы mtime
+                    f.flush()
+                    os.utime(f.fileno(), ns=times_ns)
             
-            meta_str = f" [{metadata.get('category', 'N/A')}]" if metadata else ""
-            logger.debug(f"Rendered template: {os.path.basename(output_path)}")
+            # Строку метаданных собираем, только если DEBUG реально включен
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Rendered template: %s%s", os.path.basename(output_path), _fmt_meta(metadata))
+
+            return output_path
 
         except Exception as exc:
-            logger.error(f"Template render failed [{output_path}]: {exc}")
+            logger.error("Template render failed [%s]: %s", output_path, exc)
+            return None
 
     def create_binary_trap(
         self,
         source_path: str,
         output_path: str,
-        metadata: Optional[Dict[str, Any]] = None,
-    ) -> None:
+        metadata: Dict[str, Any],
+        ext: Optional[str] = None,
+        times_ns: Optional[Tuple[int, int]] = None,
+    ) -> Optional[str]:
         """
         Создает бинарный файл-ловушку (DOCX, PDF, XLSX).
 
@@ -150,53 +476,112 @@ class ContentGenerator:
 
         Args:
             source_path (str): Путь к "золотому образу" (исходному файлу).
-            output_path (str): Путь сохранения ловушки.
-            metadata (Optional[Dict]): Метаданные (включая trap_id для уникализации).
+            output_path (str): Путь сохранения ловушки. Родительская
+                директория должна существовать (ее создает TrapFactory).
+            metadata (Dict): Метаданные; обязателен ключ trap_id для уникализации.
+                Проверяется до копирования: без него output_path не создается.
+            ext (Optional[str]): Расширение output_path в нижнем регистре, если
+                уже известно (TrapTask.ext); иначе вычисляется здесь.
+            times_ns (Optional[Tuple[int, int]]): Заранее вычисленные метки
+                (atime_ns, mtime_ns); без них пара вычисляется здесь.
+
+        Returns:
+            Optional[str]: Путь созданной ловушки или None при ошибке.
         """
-        try:
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # 1. Уникальный ID для watermarking назначает TrapFactory при разборе
+        # манифеста. Берем его до копирования: иначе на диске осталась бы
+        # копия шаблона без watermark и со "свежей" датой
+        trap_id = metadata.get("trap_id") if metadata else None
+        if not trap_id:
+            logger.error("Binary generation failed [%s]: metadata has no trap_id", output_path)
+            return None
 
-            # 1. Копируем файл
-            shutil.copy2(source_path, output_path)
-            
-            # 2. Генерируем уникальный ID для watermarking
-            trap_id = metadata.get("trap_id", str(uuid.uuid4())) if metadata else str(uuid.uuid4())
+        try:
+            # 2. Копируем файл (reflink/copy_file_range/sendfile, copy2 — последний fallback)
+            try:
+                _fast_copy(source_path, output_path)
+            except OSError:
+                shutil.copy2(source_path, output_path)
             
-            # 3. Применяем стратегию внедрения watermark в зависимости от типа файла
-            if output_path.endswith(('.docx', '.xlsx', '.pptx', '.zip')):
+            # 3. Метки для Time Stomping: их применит последний писатель по своему fd
+            if times_ns is None:
+                times_ns = compute_stomp_times()
+
+            # 4. Применяем стратегию внедрения watermark в зависимости от типа файла
+            if ext is None:
+                ext = os.path.splitext(output_path)[1].lower()
+            if ext in _ZIP_EXTENSIONS:
                 # Для ZIP-based форматов (Office) используем безопасную инъекцию в комментарий архива
-                self._inject_zip_comment(output_path, trap_id)
+                self._inject_zip_comment(output_path, trap_id, times_ns)
             else:
                 # Для остальных просто дописываем в конец файла
-                self._append_watermark(output_path, trap_id)
+                self._append_watermark(output_path, trap_id, times_ns)
 
-            # 4. Подделываем дату создания
-            stomp_timestamp(output_path)
+            # Строку метаданных собираем, только если DEBUG реально включен
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Binary artifact cloned: %s%s", os.path.basename(output_path), _fmt_meta(metadata))
 
-            meta_str = f" [{metadata.get('category', 'N/A')}]" if metadata else ""
-            logger.debug(f"Binary artifact cloned: {os.path.basename(output_path)}")
+            return output_path
 
         except Exception as exc:
-            logger.error(f"Binary generation failed [{output_path}]: {exc}")
+            logger.error("Binary generation failed [%s]: %s", output_path, exc)
+            return None
 
-    def _inject_zip_comment(self, filepath: str, trap_id: str):
+    def _inject_zip_comment(self, filepath: str, trap_id: str, times_ns: Tuple[int, int]):
         """
         Внедряет ID ловушки в комментарий ZIP-архива.
         Это легальный способ добавить данные в DOCX/XLSX, не нарушая их структуру.
+
+        Комментарий хранится в конце записи EOCD (End Of Central Directory)
+        в хвосте файла, поэтому запись патчится на месте: центральный каталог
+        не разбирается и не перезаписывается. Временные метки times_ns
+        применяются через тот же дескриптор после записи.
         """
-        try:
-            with zipfile.ZipFile(filepath, mode='a') as zf:
-                # Комментарий в ZIP должен быть в байтах
-                zf.comment = f"PHANTOM_ID:{trap_id}".encode('utf-8')
-        except zipfile.BadZipFile:
-            # Если файл битый, используем fallback стратегию
-            self._append_watermark(filepath, trap_id)
+        comment = _ZIP_COMMENT_PREFIX + trap_id.encode('utf-8')
+
+        with open(filepath, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
 
-    def _append_watermark(self, filepath: str, trap_id: str):
+            # Быстрый путь: у шаблонов обычно нет комментария, и EOCD —
+            # это ровно последние 22 байта файла
+            eocd_off = -1
+            if size >= _EOCD_SIZE:
+                f.seek(size - _EOCD_SIZE)
+                record = f.read(_EOCD_SIZE)
+                if record[:4] == _EOCD_SIGNATURE and record[-2:] == b"\x00\x00":
+                    eocd_off = size - _EOCD_SIZE
+
+            if eocd_off < 0:
+                # EOCD лежит в последних 22 + 65535 байтах (запись + макс. комментарий)
+                tail_start = max(0, size - _EOCD_SIZE - _ZIP_MAX_COMMENT)
+                f.seek(tail_start)
+                tail = f.read()
+
+                idx = tail.rfind(_EOCD_SIGNATURE)
+                if idx < 0 or len(tail) - idx < _EOCD_SIZE:
+                    # Если файл битый, используем fallback стратегию
+                    self._append_watermark(filepath, trap_id, times_ns)
+                    return
+                eocd_off = tail_start + idx
+
+            # Смещение 20 в EOCD — длина комментария, за ней сам комментарий
+            f.seek(eocd_off + _EOCD_SIZE - 2)
+            f.write(struct.pack("<H", len(comment)) + comment)
+            # truncate сбрасывает буфер, так что после него в файл уже ничего не пишется
+            f.truncate()
+            os.utime(f.fileno(), ns=times_ns)
+
+    def _append_watermark(self, filepath: str, trap_id: str, times_ns: Tuple[int, int]):
         """
         Дописывает данные в конец файла.
         Работает для PDF и других форматов, которые игнорируют мусор в конце (EOF).
+        Временные метки times_ns применяются через тот же дескриптор.
         """
-        watermark = f"\n<!-- PHANTOM_TRAP_ID:{trap_id} -->".encode('utf-8')
-        with open(filepath, "ab") as f:
-            f.write(watermark)
+        watermark = b"".join((_WATERMARK_PREFIX, trap_id.encode('utf-8'), _WATERMARK_SUFFIX))
+        # Несколько десятков байт — один os.write без буферизованного writer
+        fd = os.open(filepath, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, watermark)
+            os.utime(fd, ns=times_ns)
+        finally:
+            os.close(fd)
@@ -2,13 +2,62 @@ import os
 import socket
 import getpass
 import logging
-import yaml
-from datetime import datetime
-from typing import Optional, Dict, Any
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, NamedTuple, Set, Tuple
 from .generators import ContentGenerator
+from .metadata import compute_stomp_times_many
 
 logger = logging.getLogger("Factory.Manager")
 
+# Имя хоста не меняется за время жизни демона: один gethostname при импорте
+try:
+    _HOSTNAME = socket.gethostname()
+except Exception:
+    _HOSTNAME = "unknown"
+
+# Пользователь и хост не меняются за время жизни демона: собираем один раз
+_SYSTEM_CONTEXT: Optional[Dict[str, Any]] = None
+
+def get_system_context() -> Dict[str, Any]:
+    """
+    Собирает информацию о текущем пользователе ОС и имени хоста.
+
+    Единая реализация для TrapFactory и точки входа демона (phantom.main).
+    Пользователь берется через getpass.getuser(): сначала переменные
+    окружения ($LOGNAME, $USER), затем база pwd. os.getlogin() не
+    используется — без терминала (systemd, cron) он всегда падает,
+    успев обратиться к utmp.
+
+    Результат кэшируется на уровне модуля; вызывающий получает копию.
+
+    Returns:
+        Dict[str, Any]: Словарь с ключами 'host' и 'user'.
+    """
+    global _SYSTEM_CONTEXT
+    if _SYSTEM_CONTEXT is None:
+        _SYSTEM_CONTEXT = {"host": _HOSTNAME, "user": getpass.getuser()}
+
+    return dict(_SYSTEM_CONTEXT)
+
+class TrapTask(NamedTuple):
+    """
+    Задача на генерацию ловушки, разобранная из манифеста один раз.
+
+    Пути уже склеены с директориями шаблонов и ловушек, идентификатор
+    назначен, а метаданные для генератора собраны заранее — в цикле
+    развертывания остается только доступ к атрибутам.
+    """
+    trap_id: str
+    template: str
+    template_path: str
+    output_path: str
+    format: str
+    category: Optional[str]
+    priority: Optional[str]
+    ext: str
+    metadata: Dict[str, Any]
+
 class TrapFactory:
     """
     Оркестратор развертывания файлов-ловушек (Honeytokens).
@@ -34,75 +83,219 @@ class TrapFactory:
         self.manifest_path = config["paths"]["manifest"]
         
         # Инициализация генератора контента (Faker + Jinja2)
-        self.generator = ContentGenerator()
+        self.generator = ContentGenerator(self.templates_dir)
 
         # Создаем единый профиль "жертвы" (Shared Context), 
         # чтобы данные во всех ловушках (имя админа, пароли) совпадали.
         self.base_context = self.generator.create_base_context()
 
         # Собираем системный контекст (реальный пользователь и хост)
-        self.system_context = self._get_system_context()
+        self.system_context = get_system_context()
 
-    def _get_system_context(self) -> Dict[str, Any]:
-        """
-        Собирает информацию о текущем пользователе ОС и имени хоста.
-
-        Использует механизм fallback: сначала пытается получить пользователя
-        через терминал (os.getlogin), если не удается — через переменные
-        окружения (getpass).
-
-        Returns:
-            Dict[str, Any]: Словарь с ключами 'host' и 'user'.
-        """
-        try:
-            user = os.getlogin()
-        except OSError:
-            # Если скрипт запущен без терминала (например, через systemd или cron)
-            user = getpass.getuser()
-        
-        try:
-            host = socket.gethostname()
-        except Exception:
-            host = "unknown"
-            
-        return {"host": host, "user": user}
+        # Кэш разобранного манифеста: ((st_mtime_ns, st_size), задачи).
+        # Повторные развертывания не перечитывают неизмененный файл.
+        self._manifest_cache: Optional[Tuple[Tuple[int, int], List[TrapTask]]] = None
 
-    def _load_trap_tasks(self) -> list:
+    def _load_trap_tasks(self) -> List[TrapTask]:
         """
         Загружает список задач на генерацию из YAML-манифеста.
 
+        Записи сразу превращаются в TrapTask. Задачам без 'id' выдаются
+        случайные UUID из одного буфера: один вызов os.urandom
+        вместо uuid4() (и syscall) на каждую ловушку.
+
+        Результат кэшируется по (st_mtime_ns, st_size) файла манифеста:
+        пока файл не изменился, повторный вызов стоит один os.stat, а задачи
+        (включая выданные UUID) переиспользуются.
+
         Returns:
-            list: Список словарей с параметрами ловушек. 
+            List[TrapTask]: Список задач.
                   Возвращает пустой список в случае ошибки ввода-вывода или парсинга.
         """
-        if not os.path.exists(self.manifest_path):
-            logger.error(f"Manifest file not found at: {self.manifest_path}")
+        # Один stat и для проверки существования, и для ключа кэша
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            logger.error("Manifest file not found at: %s", self.manifest_path)
             return []
+        except OSError as e:
+            logger.error("Failed to load manifest %s: %s", self.manifest_path, e)
+            return []
+
+        cache_key = (st.st_mtime_ns, st.st_size)
+        if self._manifest_cache is not None and self._manifest_cache[0] == cache_key:
+            return self._manifest_cache[1]
             
+        # yaml импортируется лениво: он нужен только при чтении манифеста
+        import yaml
+
+        # C-парсер libyaml в разы быстрее чистого Python; если PyYAML собран
+        # без него, используем обычный SafeLoader (поведение то же)
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
         try:
-            with open(self.manifest_path, 'r', encoding='utf-8') as f:
-                # Безопасная загрузка YAML и извлечение ключа 'traps'
-                return yaml.safe_load(f).get("traps", [])
+            # Манифест читается целиком одним read по размеру из stat выше;
+            # байты декодирует сам парсер (UTF-8 по умолчанию)
+            fd = os.open(self.manifest_path, os.O_RDONLY)
+            try:
+                data = os.read(fd, st.st_size)
+            finally:
+                os.close(fd)
+
+            # Безопасная загрузка YAML и извлечение ключа 'traps'
+            raw_tasks = yaml.load(data, Loader=loader).get("traps", [])
+
+            missing = sum(1 for d in raw_tasks if not d.get("id"))
+            pool_bytes = os.urandom(16 * missing)
+            offset = 0
+
+            # Атрибуты и функции, нужные на каждую запись, — в локальные переменные
+            templates_dir, traps_dir = self.templates_dir, self.traps_dir
+            user, host = self.system_context["user"], self.system_context["host"]
+            join, splitext = os.path.join, os.path.splitext
+
+            tasks = []
+            for d in raw_tasks:
+                template = d["template"]
+                category, priority = d.get("category"), d.get("priority")
+                output_path = join(traps_dir, d["output"])
+                trap_id = d.get("id")
+                if not trap_id:
+                    trap_id = str(uuid.UUID(bytes=pool_bytes[offset:offset + 16]))
+                    offset += 16
+
+                tasks.append(TrapTask(
+                    trap_id=trap_id,
+                    template=template,
+                    template_path=join(templates_dir, template),
+                    output_path=output_path,
+                    format=d.get("format", "binary"),
+                    category=category,
+                    priority=priority,
+                    ext=splitext(output_path)[1].lower(),
+                    # Метаданные для логирования и возможной аналитики
+                    metadata={
+                        "category": category,
+                        "priority": priority,
+                        "trap_id": trap_id,
+                        "user": user,
+                        "host": host,
+                    },
+                ))
+
+            self._manifest_cache = (cache_key, tasks)
+            return tasks
         except Exception as e:
-            logger.error(f"Failed to load manifest {self.manifest_path}: {e}")
+            logger.error("Failed to load manifest %s: %s", self.manifest_path, e)
             return []
 
+    def _scan_templates(self, tasks: List[TrapTask]) -> Set[str]:
+        """
+        Собирает пути всех существующих файлов шаблонов, нужных задачам.
+
+        Каждая директория шаблонов (корень и подпапки вроде binary/)
+        читается одним os.scandir, вместо os.path.exists на каждую задачу.
+
+        Args:
+            tasks (List[TrapTask]): Задачи текущего развертывания.
+
+        Returns:
+            Set[str]: Пути файлов в том же виде, что и TrapTask.template_path.
+        """
+        available = set()
+        for directory in {os.path.dirname(task.template_path) for task in tasks}:
+            try:
+                with os.scandir(directory) as it:
+                    available.update(entry.path for entry in it if entry.is_file())
+            except OSError:
+                # Директории нет (или она недоступна) — ее шаблоны считаются отсутствующими
+                continue
+        return available
+
+    def _template_available(self, task: TrapTask, available: Set[str]) -> bool:
+        """
+        Логирует начало обработки задачи и проверяет наличие ее шаблона.
+
+        Args:
+            task (TrapTask): Задача из манифеста.
+            available (Set[str]): Результат _scan_templates.
+
+        Returns:
+            bool: True, если файл шаблона существует.
+        """
+        logger.info("[Generator] Processing artifact ID: %s | Template: %s", task.trap_id, task.template)
+
+        # Пропуск задачи, если шаблон отсутствует физически
+        if task.template_path not in available:
+            logger.error("[Generator] Template missing: %s. Skipping.", task.template_path)
+            return False
+        return True
+
+    def _deploy_text_one(self, task: TrapTask, times_ns: Tuple[int, int]) -> Optional[str]:
+        """
+        Разворачивает одну текстовую ловушку (рендеринг Jinja2 шаблона).
+
+        Вызывается параллельно из пула потоков для задач, чей шаблон уже
+        найден (deploy_traps), поэтому общее состояние фабрики (base_context,
+        пути) здесь только читается. Time Stomping генератор применяет сам,
+        по дескриптору только что записанного файла.
+
+        Args:
+            task (TrapTask): Задача из манифеста с форматом 'text'.
+            times_ns (Tuple[int, int]): Метки (atime_ns, mtime_ns) этой ловушки
+                из пакета, вычисленного в deploy_traps.
+
+        Returns:
+            Optional[str]: Путь созданной ловушки или None, если генерация не удалась.
+        """
+        # Для текстовых файлов создаем уникальный контекст (версии, даты)
+        # на основе базового профиля
+        trap_ctx = self.generator.create_trap_context(self.base_context)
+        return self.generator.create_text_trap(
+            task.template, task.output_path, trap_ctx, metadata=task.metadata, times_ns=times_ns
+        )
+
+    def _deploy_binary_one(self, task: TrapTask, times_ns: Tuple[int, int]) -> Optional[str]:
+        """
+        Разворачивает одну бинарную ловушку (docx, pdf): копирование с уникализацией.
+
+        Контекст шаблона для бинарных файлов не нужен и не создается.
+        Остальные правила те же, что у _deploy_text_one.
+
+        Args:
+            task (TrapTask): Задача из манифеста с бинарным форматом.
+            times_ns (Tuple[int, int]): Метки (atime_ns, mtime_ns) этой ловушки.
+
+        Returns:
+            Optional[str]: Путь созданной ловушки или None при ошибке.
+        """
+        return self.generator.create_binary_trap(
+            task.template_path, task.output_path, metadata=task.metadata, ext=task.ext, times_ns=times_ns
+        )
+
     def deploy_traps(self) -> Dict[str, Any]:
         """
         Основной метод: разворачивает набор ловушек согласно манифесту.
 
         Создает целевые директории, перебирает задачи и делегирует создание
         файлов классу ContentGenerator в зависимости от формата (text/binary).
+        Задачи независимы друг от друга (разные выходные пути), поэтому
+        выполняются параллельно: текстовые и бинарные — в отдельных пулах
+        потоков, размер которых подобран под характер нагрузки.
 
         Returns:
             Dict[str, Any]: Отчет о результатах, содержащий количество 
                             развернутых ловушек ('deployed') и общее число задач ('total').
         """
 
-        logger.info(f"Daemon initialized (PID: {os.getpid()}). User context: {self.system_context['user']}@{self.system_context['host']}")
+        logger.info(
+            "Daemon initialized (PID: %d). User context: %s@%s",
+            os.getpid(), self.system_context["user"], self.system_context["host"],
+        )
         logger.info("Starting honeytoken deployment sequence...")
 
-        # Гарантируем существование целевой папки
+        # Гарантируем существование целевой папки на каждом развертывании:
+        # ее могли удалить между запусками (очистка или атакующий)
         os.makedirs(self.traps_dir, exist_ok=True)
         
         tasks = self._load_trap_tasks()
@@ -111,36 +304,64 @@ class TrapFactory:
             logger.warning("No trap tasks found in manifest. Nothing to deploy.")
             return {"deployed": 0, "total": 0}
 
-        success = 0
-        for task in tasks:
-            tpl_path = os.path.join(self.templates_dir, task["template"])
-            out_path = os.path.join(self.traps_dir, task["output"])
+        # Задачи без шаблона отсеиваем до пулов: одно чтение каждой
+        # директории шаблонов вместо проверки существования на каждую задачу
+        available = self._scan_templates(tasks)
+        ready = [task for task in tasks if self._template_available(task, available)]
 
-            logger.info(f"[Generator] Processing artifact ID: {task.get('id', 'N/A')} | Template: {task['template']}")
+        # Создаем все родительские директории ловушек (например, .aws/) один раз,
+        # а не makedirs на каждую задачу внутри генератора. Сбой одной
+        # директории (EACCES, файл на месте .aws) снимает только ее задачи
+        parents = {os.path.dirname(task.output_path) for task in ready}
+        parents.discard(self.traps_dir)
+        failed_parents = set()
+        for parent in parents:
+            try:
+                os.makedirs(parent, exist_ok=True)
+            except OSError as e:
+                logger.error("[Generator] Cannot create directory %s: %s. Skipping its traps.", parent, e)
+                failed_parents.add(parent)
+        if failed_parents:
+            ready = [task for task in ready if os.path.dirname(task.output_path) not in failed_parents]
 
-            # Пропуск задачи, если шаблон отсутствует физически
-            if not os.path.exists(tpl_path):
-                logger.error(f"[Generator] Template missing: {tpl_path}. Skipping.")
-                continue
+        # Разделяем задачи по типу нагрузки: рендеринг шаблонов упирается в CPU
+        # (небольшой пул по числу ядер), копирование бинарников — в I/O
+        # (пул с запасом потоков). Ветвление по формату уходит из цикла.
+        text_tasks = [task for task in ready if task.format == "text"]
+        binary_tasks = [task for task in ready if task.format != "text"]
+        # Потоков не больше, чем задач в своей группе (минимум 1 — требование пула)
+        cpu_count = os.cpu_count() or 1
+        text_workers = max(1, min(cpu_count, len(text_tasks)))
+        binary_workers = max(1, min(32, cpu_count * 4, len(binary_tasks)))
 
-            # Подготовка метаданных для логирования и возможной аналитики
-            metadata = {
-                "category": task.get("category"),
-                "priority": task.get("priority"),
-                "trap_id": task.get("id"),
-            }
-
-            # Выбор стратегии генерации
-            if task.get("format") == "text":
-                # Для текстовых файлов создаем уникальный контекст (версии, даты)
-                # на основе базового профиля
-                trap_ctx = self.generator.create_trap_context(self.base_context)
-                self.generator.create_text_trap(tpl_path, out_path, trap_ctx, metadata=metadata)
-            else: 
-                # Для бинарных файлов (docx, pdf) используем копирование с уникализацией
-                self.generator.create_binary_trap(tpl_path, out_path, metadata=metadata)
-            
-            success += 1
+        # Метки Time Stomping для всех ловушек — одним пакетом: одно чтение
+        # часов и один вызов генератора случайных чисел на развертывание
+        stomp_times = iter(compute_stomp_times_many(len(text_tasks) + len(binary_tasks)))
+
+        written = []
+        with ThreadPoolExecutor(max_workers=text_workers) as text_pool, \
+                ThreadPoolExecutor(max_workers=binary_workers) as binary_pool:
+            futures = [
+                (task, text_pool.submit(self._deploy_text_one, task, next(stomp_times)))
+                for task in text_tasks
+            ]
+            futures += [
+                (task, binary_pool.submit(self._deploy_binary_one, task, next(stomp_times)))
+                for task in binary_tasks
+            ]
+            # Собираем результаты по каждой задаче: сбой одной ловушки
+            # не должен отменять подсчет остальных
+            for task, future in futures:
+                try:
+                    path = future.result()
+                except Exception as e:
+                    logger.error("[Generator] Artifact %s failed: %s", task.trap_id, e)
+                    continue
+                if path:
+                    written.append(path)
+
+        # Time Stomping уже применен писателями по открытому fd (метки из пакета)
+        success = len(written)
 
-        logger.info(f"Deployment sequence completed. Active sensors: {success}/{len(tasks)}.")
+        logger.info("Deployment sequence completed. Active sensors: %d/%d.", success, len(tasks))
         return {"deployed": success, "total": len(tasks)}
@@ -1,52 +1,68 @@
-import os
 import random
 import time
-import logging
+from typing import List, Tuple
 
-# Инициализация логгера для модуля метаданных
-logger = logging.getLogger("Factory.Meta")
+_SECONDS_IN_DAY = 86400
+_NS_IN_SECOND = 1_000_000_000
 
-def stomp_timestamp(filepath: str) -> None:
+# Связанные функции на уровне модуля: без поиска атрибутов на каждый вызов
+_getrandbits = random.getrandbits
+_time_ns = time.time_ns
+
+_MASK_64 = (1 << 64) - 1
+
+def _stomp_times_from_bits(r: int, current_time_ns: int) -> Tuple[int, int]:
     """
-    Применяет технику Anti-Forensics: Time Stomping (подделка временных меток).
+    Превращает 64 случайных бита в пару старых временных меток.
 
-    Изменяет время последнего доступа (atime) и модификации (mtime) файла,
-    сдвигая их в прошлое. Это создает иллюзию, что файл является "старым"
-    и легитимным артефактом системы, а не свежесозданной ловушкой.
+    Поля заметно шире диапазонов, поэтому смещение от % пренебрежимо мало.
+    """
+    # 1. Определяем "возраст" файла (от 10 до 300 дней назад)
+    days_ago = 10 + (r & 0xFFFF) % 291
+    
+    # 2. Добавляем "шум" (секунды внутри суток), чтобы время не было ровно 00:00:00
+    noise = ((r >> 16) & 0xFFFFFF) % (_SECONDS_IN_DAY + 1)
+    
+    # 3. Вычисляем целевое время модификации (когда файл был "написан")
+    mtime_ns = current_time_ns - (days_ago * _SECONDS_IN_DAY + noise) * _NS_IN_SECOND
+    
+    # 4. Вычисляем время доступа (когда файл был "прочитан")
+    # Логика: файл создали, а через 5-300 секунд проверили (cat/open).
+    # atime должен быть >= mtime.
+    atime_ns = mtime_ns + (5 + ((r >> 40) & 0xFFFF) % 296) * _NS_IN_SECOND
+
+    return atime_ns, mtime_ns
+
+def compute_stomp_times() -> Tuple[int, int]:
+    """
+    Вычисляет правдоподобные "старые" временные метки для файла-ловушки.
+
+    Метки считаются в целых наносекундах: os.utime(..., ns=...) принимает их
+    без преобразования float -> timespec. Применяют их сами писатели ловушек
+    (ContentGenerator) по дескриптору только что записанного файла.
+
+    Returns:
+        Tuple[int, int]: Пара (atime_ns, mtime_ns) для os.utime(..., ns=...).
+    """
+    # Одно обращение к генератору: 64 случайных бита режутся на поля
+    return _stomp_times_from_bits(_getrandbits(64), _time_ns())
+
+def compute_stomp_times_many(count: int) -> List[Tuple[int, int]]:
+    """
+    Пакетный вариант compute_stomp_times для всего развертывания.
+
+    Часы читаются один раз на пакет, энтропия для всех файлов берется одним
+    вызовом getrandbits и режется по 64 бита на файл: у каждой ловушки
+    по-прежнему свои независимые смещения.
 
     Args:
-        filepath (str): Полный или относительный путь к целевому файлу.
+        count (int): Количество файлов-ловушек.
+
+    Returns:
+        List[Tuple[int, int]]: Пары (atime_ns, mtime_ns), по одной на файл.
     """
-    
-    # Защита: если файла нет, просто выходим, не ломая программу
-    if not os.path.exists(filepath):
-        logger.debug(f"File not found for stomping: {filepath}")
-        return
-
-    try:
-        # 1. Определяем "возраст" файла (от 10 до 300 дней назад)
-        days_ago = random.randint(10, 300)
-        
-        # 2. Добавляем "шум" (секунды внутри суток), чтобы время не было ровно 00:00:00
-        seconds_in_day = 86400
-        noise = random.randint(0, seconds_in_day)
-        
-        # 3. Вычисляем целевое время модификации (когда файл был "написан")
-        current_time = time.time()
-        mtime = current_time - (days_ago * seconds_in_day) - noise
-        
-        # 4. Вычисляем время доступа (когда файл был "прочитан")
-        # Логика: файл создали, а через 5-300 секунд проверили (cat/open).
-        # atime должен быть >= mtime.
-        atime = mtime + random.randint(5, 300)
-
-        # 5. Применяем изменения к inode файла
-        os.utime(filepath, (atime, mtime))
-        
-        logger.debug(f"Time stomped: {os.path.basename(filepath)} -> {days_ago} days ago")
-        
-    except OSError as e:
-        # Ловим системные ошибки (например, нет прав доступа), но не прерываем работу демона
-        logger.warning(f"Failed to stomp time for {filepath}: {e}")
-    except Exception as e:
-        logger.error(f"Unexpected error in metadata module: {e}")
+    if count <= 0:
+        return []
+    now_ns = _time_ns()
+    bits = _getrandbits(64 * count)
+    return [_stomp_times_from_bits((bits >> (64 * i)) & _MASK_64, now_ns) for i in range(count)]
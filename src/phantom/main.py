@@ -1,10 +1,7 @@
-import os
 import sys
-import time
+import signal
 import logging
-import logging.config
-import yaml
-from typing import Dict, Any
+import threading
 
 # --- Импорты модулей проекта ---
 # Мы импортируем классы, а не функции, чтобы было понятно,
@@ -12,7 +9,6 @@ from typing import Dict, Any
 from phantom.core.config import load_config
 from phantom.core.orchestrator import Orchestrator
 from phantom.factory.manager import TrapFactory
-from phantom.sensors.inotify import InotifySensor
 
 # Инициализируем корневой логгер, чтобы видеть сообщения до загрузки конфига
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - [%(levelname)s] - %(message)s')
@@ -22,33 +18,20 @@ def setup_logging(config_path: str = "config/logging.yaml"):
     """
     Настраивает систему логирования на основе YAML-конфига.
     """
+    # yaml и logging.config нужны только здесь: импортируем их лениво,
+    # чтобы не платить за загрузку модулей при импорте phantom.main
+    import yaml
+    from logging.config import dictConfig
+
     try:
+        # C-парсер libyaml (если PyYAML собран с ним), иначе обычный SafeLoader
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
         with open(config_path, 'rt') as f:
-            log_config = yaml.safe_load(f.read())
-        logging.config.dictConfig(log_config)
+            log_config = yaml.load(f, Loader=loader)
+        dictConfig(log_config)
         logger.info("✅ Logging system configured successfully from YAML.")
     except Exception as e:
-        logger.error(f"🔥 Failed to configure logging from {config_path}: {e}. Using basic config.")
-
-def get_system_context() -> Dict[str, Any]:
-    """
-    Собирает базовый системный контекст (кто и где запускает).
-    Эта функция дублирует логику из TrapFactory, чтобы контекст
-    был доступен на самом верхнем уровне.
-    """
-    import socket
-    import getpass
-    try:
-        user = os.getlogin()
-    except OSError:
-        user = getpass.getuser()
-    
-    try:
-        host = socket.gethostname()
-    except Exception:
-        host = "unknown"
-        
-    return {"host": host, "user": user}
+        logger.error("🔥 Failed to configure logging from %s: %s. Using basic config.", config_path, e)
 
 def run():
     """
@@ -68,7 +51,7 @@ def run():
         logger.critical("🔥 Main configuration file 'config/phantom.yaml' not found. Exiting.")
         sys.exit(1)
     except Exception as e:
-        logger.critical(f"🔥 Error loading configuration: {e}. Exiting.")
+        logger.critical("🔥 Error loading configuration: %s. Exiting.", e)
         sys.exit(1)
 
     # 3. Развертывание ловушек
@@ -85,7 +68,7 @@ def run():
             sys.exit(1)
 
     except Exception as e:
-        logger.critical(f"🔥 A critical error occurred during trap deployment: {e}")
+        logger.critical("🔥 A critical error occurred during trap deployment: %s", e)
         sys.exit(1)
 
     # 4. Инициализация ядра (Оркестратора)
@@ -94,23 +77,31 @@ def run():
 
     # 5. Запуск сенсоров
     # В MVP используется только 'inotify', но архитектура готова к расширению.
+    # Модуль сенсора импортируется только перед его созданием.
+    from phantom.sensors.inotify import InotifySensor
     sensor = InotifySensor(config, callback=orchestrator.handle_event)
     
+    # SIGINT (Ctrl+C) и SIGTERM (systemd stop) лишь взводят событие остановки
+    shutdown = threading.Event()
+
+    def _request_shutdown(signum, frame):
+        logger.info("🛑 %s received. Shutting down gracefully...", signal.Signals(signum).name)
+        shutdown.set()
+
+    signal.signal(signal.SIGINT, _request_shutdown)
+    signal.signal(signal.SIGTERM, _request_shutdown)
+
     try:
         sensor.start()
         logger.info("✅ System is active. Monitoring for threats...")
         
-        # Бесконечный цикл, чтобы демон не завершался.
-        # В реальности, в systemd-сервисе это может быть не нужно,
-        # но для ручного запуска и отладки - обязательно.
-        while True:
-            time.sleep(3600) # "Спим" большими интервалами для экономии CPU
-
-    except KeyboardInterrupt:
-        # Корректная обработка Ctrl+C
-        logger.info("🛑 SIGINT received. Shutting down gracefully...")
+        # Блокируемся в ядре до сигнала остановки: в отличие от цикла
+        # со sleep, процесс не просыпается периодически и не тратит CPU.
+        # Для ручного запуска и отладки это по-прежнему обязательно.
+        shutdown.wait()
+
     except Exception as e:
-        logger.critical(f"🔥 A critical error occurred in the main loop: {e}")
+        logger.critical("🔥 A critical error occurred in the main loop: %s", e)
     finally:
         # Гарантированно останавливаем мониторинг перед выходом
         sensor.stop()